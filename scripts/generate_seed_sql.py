@@ -1,14 +1,40 @@
+import argparse
 import csv
 import json
+import os
+import random
 import re
+import statistics
+import time
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 DATA_DIR = BASE_DIR / "Data"
 STATE_DIR = BASE_DIR / "state"
 OUTPUT_PATH = Path(__file__).resolve().parent / "seed.sql"
 
+SEPARATOR = "\n-- STATEMENT_END --\n"
+
+# Target size of a single emitted statement (UTF-8 bytes, header included).
+DEFAULT_STATEMENT_BYTES = 256 * 1024
+
+# Upper bound on rows per statement, applied on top of the byte budget.
+DEFAULT_ROW_CAPS = {
+    "Domain": 200,
+    "Feature": 200,
+    "ProductFunction": 200,
+    "TechnicalFunction": 200,
+    "UseCase": 200,
+    "UseCaseTechnicalFunction": 500,
+}
+
+# Candidates tried per table when --autotune is given; --max-bytes and --max-rows
+# act as ceilings and are always tried themselves.
+AUTOTUNE_BYTE_CANDIDATES = [32 * 1024, 64 * 1024, 128 * 1024, 256 * 1024, 512 * 1024, 1024 * 1024]
+AUTOTUNE_ROW_CANDIDATES = [25, 50, 100, 200, 500, 1000]
+AUTOTUNE_REPEATS = 5
+
 
 def norm_id(value: str) -> str:
     if value is None:
@@ -22,8 +48,130 @@ def sql_escape(value: str) -> str:
     return "'" + str(value).replace("'", "''") + "'"
 
 
-def chunked(items: List[Any], size: int) -> List[List[Any]]:
-    return [items[i:i + size] for i in range(0, len(items), size)]
+def pack_batches(prefix: str, values: List[str], suffix: str, max_bytes: int, max_rows: int) -> List[List[str]]:
+    """Group rendered VALUES tuples into batches of at most max_bytes / max_rows per statement.
+
+    A single tuple larger than the byte budget is still emitted, on its own.
+    """
+    batches = []
+    fixed = len(prefix.encode("utf-8")) + len(suffix.encode("utf-8"))
+    batch: List[str] = []
+    size = fixed
+    for value in values:
+        # ",\n" joins every tuple after the first
+        value_size = len(value.encode("utf-8")) + (2 if batch else 0)
+        if batch and (size + value_size > max_bytes or len(batch) >= max_rows):
+            batches.append(batch)
+            batch = []
+            size = fixed
+            value_size -= 2
+        batch.append(value)
+        size += value_size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def pack_statements(prefix: str, values: List[str], suffix: str, max_bytes: int, max_rows: int) -> List[str]:
+    return [
+        prefix + ",\n".join(batch) + suffix
+        for batch in pack_batches(prefix, values, suffix, max_bytes, max_rows)
+    ]
+
+
+class StatementPlanner:
+    """Turns per-table rows into statements, optionally autotuning the batch size.
+
+    Autotune tries every (byte budget, row cap) pair up to the configured limits.
+    Pairs that pack the rows identically are timed once. Each trial loads into a
+    fresh scratch copy of the table (LIKE ... INCLUDING ALL, so no foreign keys)
+    with one commit per statement, as scripts/seed.ts does, and is dropped right
+    after. Trials are repeated in shuffled order after a warm-up pass and the
+    packing with the best median throughput wins.
+    """
+
+    def __init__(self, max_bytes: int, row_caps: Dict[str, int], autotune_url: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.row_caps = row_caps
+        self.conn = None
+        if autotune_url:
+            try:
+                import psycopg
+            except ImportError:
+                raise SystemExit("--autotune requires psycopg (pip install 'psycopg[binary]').")
+            try:
+                self.conn = psycopg.connect(autotune_url, autocommit=True)
+            except psycopg.Error as e:
+                raise SystemExit(f"--autotune could not connect: {e}")
+
+    def plan(self, table: str, prefix: str, values: List[str], suffix: str) -> List[str]:
+        max_rows = self.row_caps[table]
+        if self.conn is None or not values:
+            return pack_statements(prefix, values, suffix, self.max_bytes, max_rows)
+
+        budgets = [b for b in AUTOTUNE_BYTE_CANDIDATES if b < self.max_bytes] + [self.max_bytes]
+        caps = [r for r in AUTOTUNE_ROW_CANDIDATES if r < max_rows] + [max_rows]
+
+        # Keyed by batch sizes: candidates that pack identically are only timed once.
+        packings: Dict[tuple, tuple] = {}
+        for budget in budgets:
+            for cap in caps:
+                batches = pack_batches(prefix, values, suffix, budget, cap)
+                key = tuple(len(batch) for batch in batches)
+                if key not in packings:
+                    statements = [prefix + ",\n".join(batch) + suffix for batch in batches]
+                    packings[key] = (budget, cap, statements)
+
+        tried = len(budgets) * len(caps)
+        if len(packings) == 1:
+            print(
+                f"Autotune: {table} packs the same way for all {tried} candidates "
+                f"(at most {max_rows} rows, {self.max_bytes // 1024} KiB); nothing to tune."
+            )
+            return next(iter(packings.values()))[2]
+        print(f"Autotune: {table} has {len(packings)} distinct packings out of {tried} candidates.")
+
+        candidates = list(packings.values())
+        timings: Dict[int, List[float]] = {i: [] for i in range(len(candidates))}
+        order = list(range(len(candidates)))
+        with self.conn.cursor() as cur:
+            for i in order:
+                self._time_load(cur, table, prefix, candidates[i][2])
+            for _ in range(AUTOTUNE_REPEATS):
+                random.shuffle(order)
+                for i in order:
+                    timings[i].append(self._time_load(cur, table, prefix, candidates[i][2]))
+
+        best = None
+        for i, (budget, cap, statements) in enumerate(candidates):
+            elapsed = statistics.median(timings[i])
+            rate = len(values) / elapsed if elapsed > 0 else float("inf")
+            print(
+                f"  {table}: {budget // 1024} KiB / {cap} rows -> "
+                f"{len(statements)} statements, {rate:,.0f} rows/s (median of {AUTOTUNE_REPEATS})"
+            )
+            if best is None or rate > best[0]:
+                best = (rate, budget, cap, statements)
+        rate, budget, cap, statements = best
+        print(f"Autotune: {table} uses {budget // 1024} KiB / {cap} rows per statement.")
+        return statements
+
+    def _time_load(self, cur, table: str, prefix: str, statements: List[str]) -> float:
+        scratch = f'"_autotune_{table}"'
+        target = f'INSERT INTO "{table}"'
+        cur.execute(f"DROP TABLE IF EXISTS {scratch}")
+        cur.execute(f'CREATE TABLE {scratch} (LIKE "{table}" INCLUDING ALL)')
+        try:
+            start = time.perf_counter()
+            for statement in statements:
+                cur.execute(statement.replace(target, f"INSERT INTO {scratch}", 1))
+            return time.perf_counter() - start
+        finally:
+            cur.execute(f"DROP TABLE IF EXISTS {scratch}")
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
 
 
 def load_json(path: Path) -> Any:
@@ -57,7 +205,7 @@ def extract_tf_ids(text: str) -> List[str]:
     return ordered
 
 
-def build_seed_sql():
+def build_seed_sql(planner: StatementPlanner):
     domains = load_json(DATA_DIR / "domains.json")
     features = load_json(DATA_DIR / "features.json")
     # Add fallback feature
@@ -80,29 +228,28 @@ def build_seed_sql():
                 tf_to_pf[tid] = pf_id
 
     sql_lines = []
-    SEPARATOR = "\n-- STATEMENT_END --\n"
 
     domain_rows = [(d.get("id"), d.get("name")) for d in domains]
-    for batch in chunked(domain_rows, 200):
-        values = ",\n".join(
-            f"({sql_escape(i)}, {sql_escape(n)})" for i, n in batch
-        )
-        sql_lines.append(
-            "INSERT INTO \"Domain\" (\"id\", \"name\") VALUES\n"
-            + values
-            + "\nON CONFLICT (\"id\") DO UPDATE SET \"name\" = EXCLUDED.\"name\";" + SEPARATOR
-        )
+    values = [f"({sql_escape(i)}, {sql_escape(n)})" for i, n in domain_rows]
+    for statement in planner.plan(
+        "Domain",
+        "INSERT INTO \"Domain\" (\"id\", \"name\") VALUES\n",
+        values,
+        "\nON CONFLICT (\"id\") DO UPDATE SET \"name\" = EXCLUDED.\"name\";",
+    ):
+        sql_lines.append(statement + SEPARATOR)
 
     feature_rows = [(f.get("id"), f.get("name"), f.get("domainId")) for f in features]
-    for batch in chunked(feature_rows, 200):
-        values = ",\n".join(
-            f"({sql_escape(i)}, {sql_escape(n)}, {sql_escape(d)})" for i, n, d in batch
-        )
-        sql_lines.append(
-            "INSERT INTO \"Feature\" (\"id\", \"name\", \"domainId\") VALUES\n"
-            + values
-            + "\nON CONFLICT (\"id\") DO UPDATE SET \"name\" = EXCLUDED.\"name\", \"domainId\" = EXCLUDED.\"domainId\";" + SEPARATOR
-        )
+    values = [
+        f"({sql_escape(i)}, {sql_escape(n)}, {sql_escape(d)})" for i, n, d in feature_rows
+    ]
+    for statement in planner.plan(
+        "Feature",
+        "INSERT INTO \"Feature\" (\"id\", \"name\", \"domainId\") VALUES\n",
+        values,
+        "\nON CONFLICT (\"id\") DO UPDATE SET \"name\" = EXCLUDED.\"name\", \"domainId\" = EXCLUDED.\"domainId\";",
+    ):
+        sql_lines.append(statement + SEPARATOR)
 
     pf_rows = []
     for pf_id, pf in pf_pool.items():
@@ -120,26 +267,27 @@ def build_seed_sql():
             )
         )
 
-    for batch in chunked(pf_rows, 200):
-        values = ",\n".join(
-            "(" + ", ".join(
-                [
-                    sql_escape(i),
-                    sql_escape(n),
-                    sql_escape(nc),
-                    sql_escape(de),
-                    sql_escape(dc),
-                    sql_escape(fid),
-                    tags,
-                ]
-            ) + ")"
-            for i, n, nc, de, dc, fid, tags in batch
-        )
-        sql_lines.append(
-            "INSERT INTO \"ProductFunction\" (\"id\", \"name\", \"nameCn\", \"descriptionEn\", \"descriptionCn\", \"featureId\", \"tags\") VALUES\n"
-            + values
-            + "\nON CONFLICT (\"id\") DO UPDATE SET \"name\" = EXCLUDED.\"name\", \"nameCn\" = EXCLUDED.\"nameCn\", \"descriptionEn\" = EXCLUDED.\"descriptionEn\", \"descriptionCn\" = EXCLUDED.\"descriptionCn\", \"featureId\" = EXCLUDED.\"featureId\", \"tags\" = EXCLUDED.\"tags\";" + SEPARATOR
-        )
+    values = [
+        "(" + ", ".join(
+            [
+                sql_escape(i),
+                sql_escape(n),
+                sql_escape(nc),
+                sql_escape(de),
+                sql_escape(dc),
+                sql_escape(fid),
+                tags,
+            ]
+        ) + ")"
+        for i, n, nc, de, dc, fid, tags in pf_rows
+    ]
+    for statement in planner.plan(
+        "ProductFunction",
+        "INSERT INTO \"ProductFunction\" (\"id\", \"name\", \"nameCn\", \"descriptionEn\", \"descriptionCn\", \"featureId\", \"tags\") VALUES\n",
+        values,
+        "\nON CONFLICT (\"id\") DO UPDATE SET \"name\" = EXCLUDED.\"name\", \"nameCn\" = EXCLUDED.\"nameCn\", \"descriptionEn\" = EXCLUDED.\"descriptionEn\", \"descriptionCn\" = EXCLUDED.\"descriptionCn\", \"featureId\" = EXCLUDED.\"featureId\", \"tags\" = EXCLUDED.\"tags\";",
+    ):
+        sql_lines.append(statement + SEPARATOR)
 
     # Define valid_tf_ids early
     valid_tf_ids = set()
@@ -195,16 +343,17 @@ def build_seed_sql():
     if missing_tf_ids:
         print(f"Created {len(missing_tf_ids)} placeholder Technical Functions.")
 
-    for batch in chunked(tf_rows, 200):
-        values = ",\n".join(
-            f"({sql_escape(i)}, {sql_escape(n)}, {sql_escape(d)}, {sql_escape(s)}, {p}, {sql_escape(pf)})"
-            for i, n, d, s, p, pf in batch
-        )
-        sql_lines.append(
-            "INSERT INTO \"TechnicalFunction\" (\"id\", \"name\", \"description\", \"state\", \"progressPercent\", \"productFunctionId\") VALUES\n"
-            + values
-            + "\nON CONFLICT (\"id\") DO UPDATE SET \"name\" = EXCLUDED.\"name\", \"description\" = EXCLUDED.\"description\", \"state\" = EXCLUDED.\"state\", \"progressPercent\" = EXCLUDED.\"progressPercent\", \"productFunctionId\" = EXCLUDED.\"productFunctionId\";" + SEPARATOR
-        )
+    values = [
+        f"({sql_escape(i)}, {sql_escape(n)}, {sql_escape(d)}, {sql_escape(s)}, {p}, {sql_escape(pf)})"
+        for i, n, d, s, p, pf in tf_rows
+    ]
+    for statement in planner.plan(
+        "TechnicalFunction",
+        "INSERT INTO \"TechnicalFunction\" (\"id\", \"name\", \"description\", \"state\", \"progressPercent\", \"productFunctionId\") VALUES\n",
+        values,
+        "\nON CONFLICT (\"id\") DO UPDATE SET \"name\" = EXCLUDED.\"name\", \"description\" = EXCLUDED.\"description\", \"state\" = EXCLUDED.\"state\", \"progressPercent\" = EXCLUDED.\"progressPercent\", \"productFunctionId\" = EXCLUDED.\"productFunctionId\";",
+    ):
+        sql_lines.append(statement + SEPARATOR)
 
     # valid_tf_ids is already defined above
     
@@ -241,30 +390,96 @@ def build_seed_sql():
         # for log in missing_tf_log[:10]: print(log)
 
 
-    for batch in chunked(uc_rows, 200):
-        values = ",\n".join(
-            f"({sql_escape(i)}, {sql_escape(n)}, {sql_escape(d)}, {sql_escape(hi)}, {sql_escape(ho)}, {sql_escape(cpf)}, {sql_escape(tfraw)})"
-            for i, n, d, hi, ho, cpf, tfraw in batch
-        )
-        sql_lines.append(
-            "INSERT INTO \"UseCase\" (\"id\", \"name\", \"description\", \"hmxInput\", \"hmxOutput\", \"customerPdFeature\", \"technicalFunctionRaw\") VALUES\n"
-            + values
-            + "\nON CONFLICT (\"id\") DO UPDATE SET \"name\" = EXCLUDED.\"name\", \"description\" = EXCLUDED.\"description\", \"hmxInput\" = EXCLUDED.\"hmxInput\", \"hmxOutput\" = EXCLUDED.\"hmxOutput\", \"customerPdFeature\" = EXCLUDED.\"customerPdFeature\", \"technicalFunctionRaw\" = EXCLUDED.\"technicalFunctionRaw\";" + SEPARATOR
-        )
-
-    for batch in chunked(uc_links, 500):
-        values = ",\n".join(
-            f"({sql_escape(uc_id)}, {sql_escape(tf_id)})" for uc_id, tf_id in batch
-        )
-        sql_lines.append(
-            "INSERT INTO \"UseCaseTechnicalFunction\" (\"useCaseId\", \"technicalFunctionId\") VALUES\n"
-            + values
-            + "\nON CONFLICT (\"useCaseId\", \"technicalFunctionId\") DO NOTHING;" + SEPARATOR
-        )
+    values = [
+        f"({sql_escape(i)}, {sql_escape(n)}, {sql_escape(d)}, {sql_escape(hi)}, {sql_escape(ho)}, {sql_escape(cpf)}, {sql_escape(tfraw)})"
+        for i, n, d, hi, ho, cpf, tfraw in uc_rows
+    ]
+    for statement in planner.plan(
+        "UseCase",
+        "INSERT INTO \"UseCase\" (\"id\", \"name\", \"description\", \"hmxInput\", \"hmxOutput\", \"customerPdFeature\", \"technicalFunctionRaw\") VALUES\n",
+        values,
+        "\nON CONFLICT (\"id\") DO UPDATE SET \"name\" = EXCLUDED.\"name\", \"description\" = EXCLUDED.\"description\", \"hmxInput\" = EXCLUDED.\"hmxInput\", \"hmxOutput\" = EXCLUDED.\"hmxOutput\", \"customerPdFeature\" = EXCLUDED.\"customerPdFeature\", \"technicalFunctionRaw\" = EXCLUDED.\"technicalFunctionRaw\";",
+    ):
+        sql_lines.append(statement + SEPARATOR)
+
+    values = [f"({sql_escape(uc_id)}, {sql_escape(tf_id)})" for uc_id, tf_id in uc_links]
+    for statement in planner.plan(
+        "UseCaseTechnicalFunction",
+        "INSERT INTO \"UseCaseTechnicalFunction\" (\"useCaseId\", \"technicalFunctionId\") VALUES\n",
+        values,
+        "\nON CONFLICT (\"useCaseId\", \"technicalFunctionId\") DO NOTHING;",
+    ):
+        sql_lines.append(statement + SEPARATOR)
 
     OUTPUT_PATH.write_text("".join(sql_lines), encoding="utf-8")
     print(f"Seed SQL written to: {OUTPUT_PATH}")
 
 
+def parse_row_caps(specs: List[str]) -> Dict[str, int]:
+    caps = dict(DEFAULT_ROW_CAPS)
+    for spec in specs:
+        table, _, size = spec.partition("=")
+        if table not in caps or not size.isdigit() or int(size) < 1:
+            raise SystemExit(f"Invalid --max-rows '{spec}', expected TABLE=N with TABLE in {', '.join(caps)}.")
+        caps[table] = int(size)
+    return caps
+
+
+def positive_int(text: str) -> int:
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {text}")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate scripts/seed.sql from the mapping data.")
+    parser.add_argument(
+        "--max-bytes",
+        type=positive_int,
+        default=DEFAULT_STATEMENT_BYTES,
+        help=f"target size of each INSERT statement in bytes (default: {DEFAULT_STATEMENT_BYTES})",
+    )
+    parser.add_argument(
+        "--max-rows",
+        action="append",
+        default=[],
+        metavar="TABLE=N",
+        help="row cap per statement for one table; repeatable. Also the ceiling for --autotune",
+    )
+    parser.add_argument(
+        "--autotune",
+        action="store_true",
+        help=(
+            "time test loads against a local Postgres and pick the byte budget and row cap per table, "
+            "up to --max-bytes / --max-rows. Each trial loads a scratch copy of the table "
+            "with one commit per statement; network latency to a remote database is not modelled"
+        ),
+    )
+    parser.add_argument(
+        "--autotune-url",
+        help="connection URL for --autotune (default: $SEED_AUTOTUNE_URL); scratch tables are dropped afterwards",
+    )
+    args = parser.parse_args()
+
+    if args.autotune_url and not args.autotune:
+        parser.error("--autotune-url is only used together with --autotune.")
+    autotune_url = args.autotune_url or os.environ.get("SEED_AUTOTUNE_URL")
+    if not args.autotune and autotune_url:
+        print("Note: SEED_AUTOTUNE_URL is set but --autotune was not given; using fixed batch sizes.")
+    if args.autotune and not autotune_url:
+        parser.error("--autotune needs --autotune-url or SEED_AUTOTUNE_URL pointing at a local database.")
+
+    planner = StatementPlanner(
+        args.max_bytes,
+        parse_row_caps(args.max_rows),
+        autotune_url if args.autotune else None,
+    )
+    try:
+        build_seed_sql(planner)
+    finally:
+        planner.close()
+
+
 if __name__ == "__main__":
-    build_seed_sql()
+    main()